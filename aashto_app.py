@@ -3,9 +3,11 @@
 
 import io
 import os
-import tempfile
+import re
+import zipfile
 from datetime import datetime
-from typing import List, Optional
+from functools import partial
+from typing import Iterator, List, Optional
 
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -17,6 +19,7 @@ from branding import (
     CLIENT_NAME, APP_TITLE, PRIMARY_COLOR, LOGO_PATH, FOOTER_NOTE, LOGO_ALT_TEXT,
     COMPANY_ADDRESS, COMPANY_PHONE, COMPANY_EMAIL, COMPANY_WEBSITE
 )
+from downloads import discard_stream, register_stream, stream_registered, streaming_available
 
 st.set_page_config(page_title=APP_TITLE, page_icon="🏗️", layout="wide")
 
@@ -175,6 +178,47 @@ def fig_to_png_bytes(fig, dpi=150):
     return buf.getvalue()
 
 
+def build_sample_result(sample_id, LL, PL, pass_10, pass_40, pass_200, is_np, red_flags) -> dict:
+    """Classify one sample and render its chart; returns the dict create_pdf_report expects."""
+    PI = 0 if is_np else LL - PL
+    classification = classify_soil(LL, PL, PI, pass_10, pass_40, pass_200, is_np)
+    chart_fig = create_sieve_chart(pass_10, pass_40, pass_200, label=sample_id)
+    chart_png = fig_to_png_bytes(chart_fig)
+    plt.close(chart_fig)
+    return {
+        "sample_id": sample_id, "classification": classification,
+        "mat_type": classify_material_type(pass_200),
+        "constituents": identify_constituents_from_classification(classification),
+        "LL": LL, "PL": PL, "PI": PI, "is_np": is_np,
+        "pass_10": pass_10, "pass_40": pass_40, "pass_200": pass_200, "red_flags": red_flags,
+        "ai_summary": generate_soil_analysis(classification, PI, LL, pass_200, pass_40, pass_10, red_flags),
+        "chart_png": chart_png
+    }
+
+
+BATCH_FLAG_COLUMNS = {"Stone": "stone", "Organic_Matter": "organic_matter", "Mottled_Color": "mottled_color"}
+
+
+def batch_row_to_result(row) -> dict:
+    """Build a sample result from one row of the batch CSV template (Y/N flags, blank = 0)."""
+    return build_sample_result(
+        str(row.get("Sample_ID", "Sample")),
+        float(row.get("LL", 0) or 0), float(row.get("PL", 0) or 0),
+        float(row.get("Pass_10", 0) or 0), float(row.get("Pass_40", 0) or 0), float(row.get("Pass_200", 0) or 0),
+        str(row.get("Non_Plastic", "N")).strip().upper().startswith("Y"),
+        [flag for col, flag in BATCH_FLAG_COLUMNS.items() if str(row.get(col, "N")).strip().upper().startswith("Y")]
+    )
+
+
+def batch_summary_df(results: list) -> pd.DataFrame:
+    """The batch results table, as shown in the app and exported as CSV."""
+    return pd.DataFrame([{
+        "Sample ID": r['sample_id'], "Classification": r['classification'],
+        "Material Type": r['mat_type'], "LL": r['LL'], "PI": r['PI'],
+        "Pass No.200 (%)": r['pass_200'], "Subgrade Rating": get_subgrade_rating(r['classification'])
+    } for r in results])
+
+
 # =============================================================================
 # 3. PDF REPORT
 # =============================================================================
@@ -214,258 +258,323 @@ class BrandedPDF(FPDF):
         self.set_text_color(0, 0, 0)
 
 
-def create_pdf_report(samples: list, project_name: str, client_name: str = "",
-                       engineer_name: str = "", stamp_image_path: str = None) -> Optional[bytes]:
+def build_pdf_report(samples: list, project_name: str, client_name: str = "",
+                     engineer_name: str = "", stamp_image=None, problems: Optional[list] = None) -> bytes:
     """samples: list of dicts, each with keys:
     sample_id, classification, mat_type, constituents, LL, PL, PI, is_np,
     pass_10, pass_40, pass_200, red_flags, ai_summary, chart_png
+    stamp_image: image bytes or a file path. Raises if the PDF cannot be built; logo, chart
+    and stamp failures still produce a report and are appended to `problems` instead.
     """
-    try:
-        pdf = BrandedPDF()
-        pdf.alias_nb_pages()
-        pdf.set_auto_page_break(auto=True, margin=22)
-
-        def safe_text(text):
-            if not isinstance(text, str):
-                text = str(text)
-            return text.encode('latin-1', errors='replace').decode('latin-1')
-
-        def draw_table_row(col_widths, values, aligns=None, line_height=5, min_row_height=8, bold=False):
-            if aligns is None:
-                aligns = ['L'] * len(values)
-            pdf.set_font("Arial", 'B' if bold else '', 10)
-            x_start = (pdf.w - sum(col_widths)) / 2
-
-            def wrap(text, width):
-                text = safe_text(text)
-                usable = width - 2
-                words = text.split(' ')
-                lines, current = [], ""
-                for word in words:
-                    trial = (current + " " + word).strip()
-                    if not current or pdf.get_string_width(trial) <= usable:
-                        current = trial
-                    else:
-                        lines.append(current)
-                        current = word
-                if current:
+    if problems is None:
+        problems = []
+    pdf = BrandedPDF()
+    pdf.alias_nb_pages()
+    pdf.set_auto_page_break(auto=True, margin=22)
+
+    def safe_text(text):
+        if not isinstance(text, str):
+            text = str(text)
+        return text.encode('latin-1', errors='replace').decode('latin-1')
+
+    def draw_table_row(col_widths, values, aligns=None, line_height=5, min_row_height=8, bold=False):
+        if aligns is None:
+            aligns = ['L'] * len(values)
+        pdf.set_font("Arial", 'B' if bold else '', 10)
+        x_start = (pdf.w - sum(col_widths)) / 2
+
+        def wrap(text, width):
+            text = safe_text(text)
+            usable = width - 2
+            words = text.split(' ')
+            lines, current = [], ""
+            for word in words:
+                trial = (current + " " + word).strip()
+                if not current or pdf.get_string_width(trial) <= usable:
+                    current = trial
+                else:
                     lines.append(current)
-                return lines or [""]
-
-            wrapped = [wrap(v, w) for v, w in zip(values, col_widths)]
-            n_lines = max(len(w) for w in wrapped)
-            row_height = max(min_row_height, n_lines * line_height)
-
-            if pdf.get_y() + row_height > pdf.h - pdf.b_margin:
-                pdf.add_page()
-
-            y_start = pdf.get_y()
-            x = x_start
-            for width, lines, align in zip(col_widths, wrapped, aligns):
-                pdf.rect(x, y_start, width, row_height)
-                pdf.set_xy(x, y_start + (row_height - len(lines) * line_height) / 2)
-                for line in lines:
-                    pdf.set_x(x)
-                    pdf.cell(width, line_height, line, 0, 2, align)
-                x += width
-            pdf.set_y(y_start + row_height)
-            pdf.set_x(pdf.l_margin)
-
-        def render_markdown_lite(text):
-            """Render the '**bold**' / '- bullet' style AI summary text as PDF paragraphs."""
-            for raw_line in text.split("\n"):
-                line = raw_line.strip()
-                if not line:
-                    pdf.ln(2)
-                    continue
-                bold = line.startswith("**") and line.count("**") >= 2
-                clean = line.replace("**", "")
-                if clean.startswith("- "):
-                    clean = "    " + chr(8226) + " " + clean[2:]  # bullet char, safe in latin-1
-                clean = clean.strip()
-                if not clean:
-                    continue
-                pdf.set_font("Arial", 'B' if bold else '', 10)
-                pdf.set_x(pdf.l_margin)
-                pdf.multi_cell(0, 5.5, safe_text(clean))
-
-        # --- Cover Page ---
-        pdf.add_page()
-        accent_rgb = hex_to_rgb(PRIMARY_COLOR)
-        pdf.set_fill_color(*accent_rgb)
-        pdf.rect(0, 0, pdf.w, 10, 'F')
+                    current = word
+            if current:
+                lines.append(current)
+            return lines or [""]
 
-        logo_bottom = 28
-        if LOGO_PATH and os.path.exists(LOGO_PATH):
-            try:
-                with Image.open(LOGO_PATH) as img:
-                    if img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    temp_logo_path = os.path.join(tempfile.gettempdir(),
-                                                f"temp_logo_{datetime.now().strftime('%Y%m%d%H%M%S')}.jpg")
-                    img.save(temp_logo_path, format='JPEG', quality=95)
-                    pdf.image(temp_logo_path, x=(pdf.w - 40) / 2, y=22, w=40)
-                    os.unlink(temp_logo_path)
-                logo_bottom = 22 + 40 + 8
-            except Exception as e:
-                st.error(f"Logo processing error: {str(e)}")
-
-        pdf.set_y(logo_bottom)
-        pdf.set_font("Arial", 'B', 24)
-        pdf.set_text_color(*accent_rgb)
-        pdf.cell(0, 14, safe_text("AASHTO Soil Classification Report"), 0, 1, 'C')
-        pdf.set_text_color(90, 90, 90)
-        pdf.set_font("Arial", '', 12)
-        pdf.cell(0, 8, safe_text(APP_TITLE), 0, 1, 'C')
-        pdf.set_text_color(0, 0, 0)
+        wrapped = [wrap(v, w) for v, w in zip(values, col_widths)]
+        n_lines = max(len(w) for w in wrapped)
+        row_height = max(min_row_height, n_lines * line_height)
 
-        pdf.ln(4)
-        pdf.set_draw_color(*accent_rgb)
-        pdf.set_line_width(0.6)
-        pdf.line(50, pdf.get_y(), pdf.w - 50, pdf.get_y())
-        pdf.set_line_width(0.2)
-        pdf.set_draw_color(0, 0, 0)
-        pdf.ln(12)
-
-        info_rows = [("Project", project_name)]
-        if client_name:
-            info_rows.append(("Prepared For", client_name))
-        info_rows.append(("Prepared By", CLIENT_NAME))
-        info_rows.append(("Date Generated", datetime.now().strftime('%Y-%m-%d %H:%M')))
-        info_rows.append(("Total Samples", str(len(samples))))
-
-        panel_w, label_w, row_h = 150, 55, 9
-        x0 = (pdf.w - panel_w) / 2
-        y0 = pdf.get_y()
-        panel_h = row_h * len(info_rows)
-        pdf.set_draw_color(200, 200, 200)
-        pdf.rect(x0, y0, panel_w, panel_h)
-        for idx, (label, value) in enumerate(info_rows):
-            y = y0 + idx * row_h
-            if idx > 0:
-                pdf.line(x0, y, x0 + panel_w, y)
-            pdf.set_xy(x0 + 4, y)
-            pdf.set_font("Arial", 'B', 11)
-            pdf.cell(label_w - 4, row_h, safe_text(label), 0, 0, 'L')
-            pdf.set_font("Arial", '', 11)
-            pdf.cell(panel_w - label_w - 4, row_h, safe_text(value), 0, 0, 'L')
-        pdf.set_draw_color(0, 0, 0)
-        pdf.set_y(y0 + panel_h + 14)
-
-        if FOOTER_NOTE:
-            pdf.set_font("Arial", 'I', 10)
-            pdf.set_text_color(120, 120, 120)
-            pdf.cell(0, 8, safe_text(FOOTER_NOTE), 0, 1, 'C')
-            pdf.set_text_color(0, 0, 0)
-
-        # --- Per-Sample Pages ---
-        for i, s in enumerate(samples, 1):
+        if pdf.get_y() + row_height > pdf.h - pdf.b_margin:
             pdf.add_page()
-            pdf.set_font("Arial", 'B', 16)
-            pdf.cell(0, 10, safe_text(f"Sample: {s.get('sample_id', f'Sample {i}')}"), 0, 1, 'C')
-            pdf.set_font("Arial", 'B', 20)
-            pdf.set_text_color(*accent_rgb)
-            pdf.cell(0, 12, safe_text(f"AASHTO Classification: {s['classification']}"), 0, 1, 'C')
-            pdf.set_text_color(0, 0, 0)
-            pdf.set_font("Arial", '', 11)
-            pdf.cell(0, 7, safe_text(s['mat_type']), 0, 1, 'C')
-            pdf.ln(4)
 
-            col_widths = [70, 60, 30]
-            draw_table_row(col_widths, ["Parameter", "Value", "Unit"], aligns=['L', 'C', 'C'], bold=True)
-            rows = [
-                ("Significant Constituents", s['constituents'], ""),
-                ("Liquid Limit (LL)", s['LL'] if not s.get('is_np') else "N/A (NP)", "%"),
-                ("Plastic Limit (PL)", s['PL'] if not s.get('is_np') else "N/A (NP)", "%"),
-                ("Plasticity Index (PI)", s['PI'], "%"),
-                ("Passing No. 10 (2.0mm)", s['pass_10'], "%"),
-                ("Passing No. 40 (0.425mm)", s['pass_40'], "%"),
-                ("Passing No. 200 (0.075mm)", s['pass_200'], "%"),
-                ("General Subgrade Rating", get_subgrade_rating(s['classification']), ""),
-                ("Red Flags", ", ".join(s['red_flags']).replace("_", " ").title() if s.get('red_flags') else "None", ""),
-            ]
-            for p, v, u in rows:
-                draw_table_row(col_widths, [p, v, u], aligns=['L', 'C', 'C'])
+        y_start = pdf.get_y()
+        x = x_start
+        for width, lines, align in zip(col_widths, wrapped, aligns):
+            pdf.rect(x, y_start, width, row_height)
+            pdf.set_xy(x, y_start + (row_height - len(lines) * line_height) / 2)
+            for line in lines:
+                pdf.set_x(x)
+                pdf.cell(width, line_height, line, 0, 2, align)
+            x += width
+        pdf.set_y(y_start + row_height)
+        pdf.set_x(pdf.l_margin)
 
-            pdf.ln(4)
-            pdf.set_font("Arial", 'B', 12)
+    def render_markdown_lite(text):
+        """Render the '**bold**' / '- bullet' style AI summary text as PDF paragraphs."""
+        for raw_line in text.split("\n"):
+            line = raw_line.strip()
+            if not line:
+                pdf.ln(2)
+                continue
+            bold = line.startswith("**") and line.count("**") >= 2
+            clean = line.replace("**", "")
+            if clean.startswith("- "):
+                clean = "    " + chr(8226) + " " + clean[2:]  # bullet char, safe in latin-1
+            clean = clean.strip()
+            if not clean:
+                continue
+            pdf.set_font("Arial", 'B' if bold else '', 10)
             pdf.set_x(pdf.l_margin)
-            pdf.cell(0, 8, safe_text("Engineering Interpretation"), 0, 1, 'L')
-            render_markdown_lite(s.get('ai_summary', ''))
-
-            if s.get("chart_png"):
-                pdf.ln(4)
-                try:
-                    chart_path = os.path.join(tempfile.gettempdir(),
-                                            f"temp_sieve_{i}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.png")
-                    with open(chart_path, 'wb') as f:
-                        f.write(s["chart_png"])
-                    if pdf.get_y() + 80 > pdf.h - pdf.b_margin:
-                        pdf.add_page()
-                    pdf.image(chart_path, x=(pdf.w - 150) / 2, w=150)
-                    os.unlink(chart_path)
-                except Exception:
-                    pass
-
-        # --- Certification Page ---
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', 18)
-        pdf.cell(0, 15, safe_text("Certification"), 0, 1, 'C')
-        pdf.ln(4)
-        pdf.set_font("Arial", '', 11)
-        pdf.set_x(pdf.l_margin)
-        pdf.multi_cell(0, 7, safe_text(
-            "This soil classification report has been reviewed and is certified as suitable "
-            "for the stated project and engineering requirements."
-        ))
-        pdf.ln(10)
+            pdf.multi_cell(0, 5.5, safe_text(clean))
 
+    # --- Cover Page ---
+    pdf.add_page()
+    accent_rgb = hex_to_rgb(PRIMARY_COLOR)
+    pdf.set_fill_color(*accent_rgb)
+    pdf.rect(0, 0, pdf.w, 10, 'F')
+
+    logo_bottom = 28
+    if LOGO_PATH and os.path.exists(LOGO_PATH):
+        try:
+            with Image.open(LOGO_PATH) as img:
+                if img.mode != 'RGB':
+                    img = img.convert('RGB')
+                pdf.image(img, x=(pdf.w - 40) / 2, y=22, w=40)
+            logo_bottom = 22 + 40 + 8
+        except Exception as e:
+            problems.append(f"Logo processing error: {str(e)}")
+
+    pdf.set_y(logo_bottom)
+    pdf.set_font("Arial", 'B', 24)
+    pdf.set_text_color(*accent_rgb)
+    pdf.cell(0, 14, safe_text("AASHTO Soil Classification Report"), 0, 1, 'C')
+    pdf.set_text_color(90, 90, 90)
+    pdf.set_font("Arial", '', 12)
+    pdf.cell(0, 8, safe_text(APP_TITLE), 0, 1, 'C')
+    pdf.set_text_color(0, 0, 0)
+
+    pdf.ln(4)
+    pdf.set_draw_color(*accent_rgb)
+    pdf.set_line_width(0.6)
+    pdf.line(50, pdf.get_y(), pdf.w - 50, pdf.get_y())
+    pdf.set_line_width(0.2)
+    pdf.set_draw_color(0, 0, 0)
+    pdf.ln(12)
+
+    info_rows = [("Project", project_name)]
+    if client_name:
+        info_rows.append(("Prepared For", client_name))
+    info_rows.append(("Prepared By", CLIENT_NAME))
+    info_rows.append(("Date Generated", datetime.now().strftime('%Y-%m-%d %H:%M')))
+    info_rows.append(("Total Samples", str(len(samples))))
+
+    panel_w, label_w, row_h = 150, 55, 9
+    x0 = (pdf.w - panel_w) / 2
+    y0 = pdf.get_y()
+    panel_h = row_h * len(info_rows)
+    pdf.set_draw_color(200, 200, 200)
+    pdf.rect(x0, y0, panel_w, panel_h)
+    for idx, (label, value) in enumerate(info_rows):
+        y = y0 + idx * row_h
+        if idx > 0:
+            pdf.line(x0, y, x0 + panel_w, y)
+        pdf.set_xy(x0 + 4, y)
         pdf.set_font("Arial", 'B', 11)
-        pdf.cell(60, 8, safe_text("Engineer Name:"), 0, 0)
+        pdf.cell(label_w - 4, row_h, safe_text(label), 0, 0, 'L')
         pdf.set_font("Arial", '', 11)
-        pdf.cell(0, 8, safe_text(engineer_name), 'B', 1)
-        pdf.ln(6)
+        pdf.cell(panel_w - label_w - 4, row_h, safe_text(value), 0, 0, 'L')
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_y(y0 + panel_h + 14)
 
-        pdf.set_font("Arial", 'B', 11)
-        pdf.cell(60, 8, safe_text("Date:"), 0, 0)
+    if FOOTER_NOTE:
+        pdf.set_font("Arial", 'I', 10)
+        pdf.set_text_color(120, 120, 120)
+        pdf.cell(0, 8, safe_text(FOOTER_NOTE), 0, 1, 'C')
+        pdf.set_text_color(0, 0, 0)
+
+    # --- Per-Sample Pages ---
+    for i, s in enumerate(samples, 1):
+        pdf.add_page()
+        pdf.set_font("Arial", 'B', 16)
+        pdf.cell(0, 10, safe_text(f"Sample: {s.get('sample_id', f'Sample {i}')}"), 0, 1, 'C')
+        pdf.set_font("Arial", 'B', 20)
+        pdf.set_text_color(*accent_rgb)
+        pdf.cell(0, 12, safe_text(f"AASHTO Classification: {s['classification']}"), 0, 1, 'C')
+        pdf.set_text_color(0, 0, 0)
         pdf.set_font("Arial", '', 11)
-        pdf.cell(0, 8, safe_text(datetime.now().strftime('%Y-%m-%d')), 'B', 1)
-        pdf.ln(15)
+        pdf.cell(0, 7, safe_text(s['mat_type']), 0, 1, 'C')
+        pdf.ln(4)
 
-        pdf.set_font("Arial", 'B', 11)
-        pdf.cell(0, 8, safe_text("Signature / Stamp"), 0, 1)
-        box_y = pdf.get_y()
-        box_w, box_h = 70, 35
-        if stamp_image_path and os.path.exists(stamp_image_path):
+        col_widths = [70, 60, 30]
+        draw_table_row(col_widths, ["Parameter", "Value", "Unit"], aligns=['L', 'C', 'C'], bold=True)
+        rows = [
+            ("Significant Constituents", s['constituents'], ""),
+            ("Liquid Limit (LL)", s['LL'] if not s.get('is_np') else "N/A (NP)", "%"),
+            ("Plastic Limit (PL)", s['PL'] if not s.get('is_np') else "N/A (NP)", "%"),
+            ("Plasticity Index (PI)", s['PI'], "%"),
+            ("Passing No. 10 (2.0mm)", s['pass_10'], "%"),
+            ("Passing No. 40 (0.425mm)", s['pass_40'], "%"),
+            ("Passing No. 200 (0.075mm)", s['pass_200'], "%"),
+            ("General Subgrade Rating", get_subgrade_rating(s['classification']), ""),
+            ("Red Flags", ", ".join(s['red_flags']).replace("_", " ").title() if s.get('red_flags') else "None", ""),
+        ]
+        for p, v, u in rows:
+            draw_table_row(col_widths, [p, v, u], aligns=['L', 'C', 'C'])
+
+        pdf.ln(4)
+        pdf.set_font("Arial", 'B', 12)
+        pdf.set_x(pdf.l_margin)
+        pdf.cell(0, 8, safe_text("Engineering Interpretation"), 0, 1, 'L')
+        render_markdown_lite(s.get('ai_summary', ''))
+
+        if s.get("chart_png"):
+            pdf.ln(4)
             try:
-                pdf.image(stamp_image_path, x=15, y=box_y, w=box_w, h=box_h)
-            except Exception:
-                pdf.rect(15, box_y, box_w, box_h)
-        else:
+                if pdf.get_y() + 80 > pdf.h - pdf.b_margin:
+                    pdf.add_page()
+                pdf.image(io.BytesIO(s["chart_png"]), x=(pdf.w - 150) / 2, w=150)
+            except Exception as e:
+                problems.append(f"Chart processing error: {str(e)}")
+
+    # --- Certification Page ---
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 18)
+    pdf.cell(0, 15, safe_text("Certification"), 0, 1, 'C')
+    pdf.ln(4)
+    pdf.set_font("Arial", '', 11)
+    pdf.set_x(pdf.l_margin)
+    pdf.multi_cell(0, 7, safe_text(
+        "This soil classification report has been reviewed and is certified as suitable "
+        "for the stated project and engineering requirements."
+    ))
+    pdf.ln(10)
+
+    pdf.set_font("Arial", 'B', 11)
+    pdf.cell(60, 8, safe_text("Engineer Name:"), 0, 0)
+    pdf.set_font("Arial", '', 11)
+    pdf.cell(0, 8, safe_text(engineer_name), 'B', 1)
+    pdf.ln(6)
+
+    pdf.set_font("Arial", 'B', 11)
+    pdf.cell(60, 8, safe_text("Date:"), 0, 0)
+    pdf.set_font("Arial", '', 11)
+    pdf.cell(0, 8, safe_text(datetime.now().strftime('%Y-%m-%d')), 'B', 1)
+    pdf.ln(15)
+
+    pdf.set_font("Arial", 'B', 11)
+    pdf.cell(0, 8, safe_text("Signature / Stamp"), 0, 1)
+    box_y = pdf.get_y()
+    box_w, box_h = 70, 35
+    if stamp_image:
+        try:
+            source = io.BytesIO(stamp_image) if isinstance(stamp_image, (bytes, bytearray)) else stamp_image
+            pdf.image(source, x=15, y=box_y, w=box_w, h=box_h)
+        except Exception as e:
+            problems.append(f"Stamp image error: {str(e)}")
             pdf.rect(15, box_y, box_w, box_h)
-        pdf.set_y(box_y + box_h + 8)
+    else:
+        pdf.rect(15, box_y, box_w, box_h)
+    pdf.set_y(box_y + box_h + 8)
 
-        pdf.set_font("Arial", '', 9)
-        pdf.set_text_color(120, 120, 120)
-        prepared_by = f"Report prepared using {APP_TITLE} by {CLIENT_NAME}."
-        if FOOTER_NOTE:
-            prepared_by += f" {FOOTER_NOTE}"
-        pdf.set_x(pdf.l_margin)
-        pdf.multi_cell(0, 5, safe_text(prepared_by))
-        pdf.set_text_color(0, 0, 0)
+    pdf.set_font("Arial", '', 9)
+    pdf.set_text_color(120, 120, 120)
+    prepared_by = f"Report prepared using {APP_TITLE} by {CLIENT_NAME}."
+    if FOOTER_NOTE:
+        prepared_by += f" {FOOTER_NOTE}"
+    pdf.set_x(pdf.l_margin)
+    pdf.multi_cell(0, 5, safe_text(prepared_by))
+    pdf.set_text_color(0, 0, 0)
+
+    pdf_output = pdf.output()
+    if isinstance(pdf_output, (bytes, bytearray)):
+        return bytes(pdf_output)
+    return pdf_output.encode('latin-1', errors='replace')
 
-        pdf_output = pdf.output()
-        if isinstance(pdf_output, (bytes, bytearray)):
-            return bytes(pdf_output)
-        return pdf_output.encode('latin-1', errors='replace')
 
+def create_pdf_report(samples: list, project_name: str, client_name: str = "",
+                      engineer_name: str = "", stamp_image=None) -> Optional[bytes]:
+    """build_pdf_report for the UI: problems are shown with st.error, failure returns None."""
+    problems = []
+    try:
+        pdf_data = build_pdf_report(samples, project_name, client_name, engineer_name, stamp_image, problems)
     except Exception as e:
         st.error(f"PDF generation failed: {str(e)}")
         return None
+    for problem in problems:
+        st.error(problem)
+    return pdf_data
 
 
 # =============================================================================
-# 4. UI
+# 4. ZIP EXPORT (one PDF per sample)
+# =============================================================================
+
+class _ZipChunkSink:
+    """Write-only, non-seekable sink that lets zipfile stream entries out in chunks."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def sample_pdf_filename(sample_id, index: int) -> str:
+    """Deterministic archive name, e.g. 'BH-1 @ 1.5m' at position 1 -> '001_BH-1_1.5m.pdf'."""
+    slug = re.sub(r"[^A-Za-z0-9.-]+", "_", str(sample_id)).strip("._") or "Sample"
+    return f"{index:03d}_{slug[:60]}.pdf"
+
+
+def iter_batch_zip(samples: list, project_name: str, client_name: str = "",
+                   engineer_name: str = "", stamp_image=None,
+                   results_csv: str = None, csv_name: str = "aashto_batch_results.csv") -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk: one build_pdf_report document per sample,
+    then the results CSV. Only one sample's PDF is held in memory at a time. When a
+    sample's PDF fails, or is built with problems (e.g. a missing chart), the reason
+    is written to an '<index>_<slug>.ERROR.txt' entry next to it.
+    """
+    sink = _ZipChunkSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for i, s in enumerate(samples, 1):
+            sample_id = s.get('sample_id', f'Sample {i}')
+            entry_name = sample_pdf_filename(sample_id, i)
+            problems = []
+            try:
+                pdf_data = build_pdf_report([s], project_name, client_name, engineer_name, stamp_image, problems)
+                zf.writestr(entry_name, pdf_data)
+                heading = f"The PDF report for sample '{sample_id}' was generated with problems:"
+            except Exception as e:
+                problems.append(f"PDF generation failed: {str(e)}")
+                heading = f"The PDF report for sample '{sample_id}' could not be generated:"
+            if problems:
+                zf.writestr(os.path.splitext(entry_name)[0] + ".ERROR.txt",
+                            heading + "\n" + "".join(f"- {p}\n" for p in problems))
+            yield sink.drain()
+        if results_csv is not None:
+            zf.writestr(csv_name, results_csv)
+    yield sink.drain()
+
+
+# =============================================================================
+# 5. UI
 # =============================================================================
 
 if LOGO_PATH and os.path.exists(LOGO_PATH):
@@ -521,20 +630,8 @@ with tab_single:
         submitted = st.form_submit_button("🚀 Classify Soil")
 
     if submitted:
-        classification = classify_soil(LL, PL, PI, pass_10, pass_40, pass_200, is_np)
-        mat_type = classify_material_type(pass_200)
-        constituents = identify_constituents_from_classification(classification)
-        ai_summary = generate_soil_analysis(classification, PI, LL, pass_200, pass_40, pass_10, red_flags)
-        chart_fig = create_sieve_chart(pass_10, pass_40, pass_200, label=sample_id)
-        chart_png = fig_to_png_bytes(chart_fig)
-        plt.close(chart_fig)
-
-        st.session_state['soil_result'] = {
-            "sample_id": sample_id, "classification": classification, "mat_type": mat_type,
-            "constituents": constituents, "LL": LL, "PL": PL, "PI": PI, "is_np": is_np,
-            "pass_10": pass_10, "pass_40": pass_40, "pass_200": pass_200,
-            "red_flags": red_flags, "ai_summary": ai_summary, "chart_png": chart_png
-        }
+        st.session_state['soil_result'] = build_sample_result(sample_id, LL, PL, pass_10, pass_40, pass_200,
+                                                              is_np, red_flags)
 
     if st.session_state.get('soil_result'):
         r = st.session_state['soil_result']
@@ -574,16 +671,9 @@ with tab_single:
                               file_name="soil_analysis.txt", mime="text/plain", key="single_txt_dl")
 
         if st.button("📄 Generate PDF Report", key="single_pdf_btn"):
-            stamp_path = None
-            if st.session_state.get('stamp_bytes'):
-                stamp_path = os.path.join(tempfile.gettempdir(),
-                                        f"temp_stamp_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.png")
-                with open(stamp_path, 'wb') as f:
-                    f.write(st.session_state['stamp_bytes'])
             pdf_data = create_pdf_report([r], project_name, client_name,
-                                        st.session_state.get('engineer_name', ''), stamp_path)
-            if stamp_path and os.path.exists(stamp_path):
-                os.unlink(stamp_path)
+                                        st.session_state.get('engineer_name', ''),
+                                        st.session_state.get('stamp_bytes'))
             if pdf_data:
                 st.download_button("⬇️ Download PDF Report", data=pdf_data,
                                   file_name=f"aashto_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
@@ -612,33 +702,7 @@ with tab_batch:
             st.dataframe(batch_input_df, use_container_width=True, hide_index=True)
 
             if st.button("🚀 Classify All Samples", key="batch_classify_btn"):
-                flag_cols = {"Stone": "stone", "Organic_Matter": "organic_matter", "Mottled_Color": "mottled_color"}
-                batch_results = []
-                for _, row in batch_input_df.iterrows():
-                    is_np_b = str(row.get("Non_Plastic", "N")).strip().upper().startswith("Y")
-                    LL_b = float(row.get("LL", 0) or 0)
-                    PL_b = float(row.get("PL", 0) or 0)
-                    PI_b = 0 if is_np_b else LL_b - PL_b
-                    pass_10_b = float(row.get("Pass_10", 0) or 0)
-                    pass_40_b = float(row.get("Pass_40", 0) or 0)
-                    pass_200_b = float(row.get("Pass_200", 0) or 0)
-                    red_flags_b = [flag_cols[c] for c in flag_cols if str(row.get(c, "N")).strip().upper().startswith("Y")]
-                    sample_id_b = str(row.get("Sample_ID", "Sample"))
-
-                    classification_b = classify_soil(LL_b, PL_b, PI_b, pass_10_b, pass_40_b, pass_200_b, is_np_b)
-                    mat_type_b = classify_material_type(pass_200_b)
-                    constituents_b = identify_constituents_from_classification(classification_b)
-                    ai_summary_b = generate_soil_analysis(classification_b, PI_b, LL_b, pass_200_b, pass_40_b, pass_10_b, red_flags_b)
-                    chart_fig_b = create_sieve_chart(pass_10_b, pass_40_b, pass_200_b, label=sample_id_b)
-                    chart_png_b = fig_to_png_bytes(chart_fig_b)
-                    plt.close(chart_fig_b)
-
-                    batch_results.append({
-                        "sample_id": sample_id_b, "classification": classification_b, "mat_type": mat_type_b,
-                        "constituents": constituents_b, "LL": LL_b, "PL": PL_b, "PI": PI_b, "is_np": is_np_b,
-                        "pass_10": pass_10_b, "pass_40": pass_40_b, "pass_200": pass_200_b,
-                        "red_flags": red_flags_b, "ai_summary": ai_summary_b, "chart_png": chart_png_b
-                    })
+                batch_results = [batch_row_to_result(row) for _, row in batch_input_df.iterrows()]
                 st.session_state['batch_results'] = batch_results
 
         except Exception as e:
@@ -649,12 +713,7 @@ with tab_batch:
         st.markdown("---")
         st.subheader(f"📊 Batch Results ({len(results)} samples)")
 
-        summary_rows = [{
-            "Sample ID": r['sample_id'], "Classification": r['classification'],
-            "Material Type": r['mat_type'], "LL": r['LL'], "PI": r['PI'],
-            "Pass No.200 (%)": r['pass_200'], "Subgrade Rating": get_subgrade_rating(r['classification'])
-        } for r in results]
-        summary_df = pd.DataFrame(summary_rows)
+        summary_df = batch_summary_df(results)
         st.dataframe(summary_df, use_container_width=True, hide_index=True)
 
         st.subheader("📥 Downloads")
@@ -662,20 +721,41 @@ with tab_batch:
                           "aashto_batch_results.csv", "text/csv", key="batch_csv_dl")
 
         if st.button("📄 Generate Batch PDF Report", key="batch_pdf_btn"):
-            stamp_path = None
-            if st.session_state.get('stamp_bytes'):
-                stamp_path = os.path.join(tempfile.gettempdir(),
-                                        f"temp_stamp_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.png")
-                with open(stamp_path, 'wb') as f:
-                    f.write(st.session_state['stamp_bytes'])
             pdf_data = create_pdf_report(results, project_name, client_name,
-                                        st.session_state.get('engineer_name', ''), stamp_path)
-            if stamp_path and os.path.exists(stamp_path):
-                os.unlink(stamp_path)
+                                        st.session_state.get('engineer_name', ''),
+                                        st.session_state.get('stamp_bytes'))
             if pdf_data:
                 st.download_button("⬇️ Download Batch PDF Report", data=pdf_data,
                                   file_name=f"aashto_batch_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
                                   mime="application/pdf", key="batch_pdf_dl")
 
+        # Runs on click, outside the script thread, so every input is bound now.
+        batch_zip_chunks = partial(iter_batch_zip, results, project_name, client_name,
+                                   st.session_state.get('engineer_name', ''), st.session_state.get('stamp_bytes'),
+                                   results_csv=summary_df.to_csv(index=False))
+        if streaming_available():
+            # One registration per results set and report inputs, reused across reruns.
+            zip_inputs = batch_zip_chunks.args[1:]
+            zip_stream = st.session_state.get('batch_zip_stream')
+            if (not zip_stream or zip_stream['results'] is not results or zip_stream['inputs'] != zip_inputs
+                    or not stream_registered(zip_stream['url'])):
+                if zip_stream:
+                    discard_stream(zip_stream['url'])
+                zip_name = f"aashto_batch_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+                zip_stream = {'results': results, 'inputs': zip_inputs,
+                              'url': register_stream(batch_zip_chunks, zip_name, "application/zip")}
+                st.session_state['batch_zip_stream'] = zip_stream
+            st.link_button("🗂️ Download Per-Sample PDFs (ZIP)", zip_stream['url'])
+            st.caption("One PDF report per sample (named by Sample_ID) plus the results CSV, "
+                       "streamed to you as each report is built.")
+        else:
+            # Fallback for plain `streamlit run aashto_app.py` only: without server.py there is
+            # no streaming route, so this builds the whole ZIP in memory before download.
+            st.download_button("🗂️ Download Per-Sample PDFs (ZIP)", data=lambda: b"".join(batch_zip_chunks()),
+                              file_name=f"aashto_batch_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                              mime="application/zip", key="batch_zip_dl")
+            st.caption("One PDF report per sample plus the results CSV. Built in memory because the app "
+                       "is not running through server.py.")
+
 st.markdown("---")
 st.caption(f"© 2025 AASHTO Classifying Tool | Built by {CLIENT_NAME}")
@@ -0,0 +1,72 @@
+# downloads.py — streaming download routes for the AASHTO Soil Classification Tool
+# Automation_hub Engineering Group Limited
+#
+# The Streamlit script registers a generator factory under a random token; the
+# /downloads/{token} route (mounted by server.py through st.App) streams it to
+# the browser chunk by chunk, so large exports never sit in memory whole.
+
+import secrets
+import threading
+import time
+
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+DOWNLOAD_TTL_SECONDS = 15 * 60
+
+_pending = {}  # token -> (expires_at, file_name, media_type, chunk_factory)
+_lock = threading.Lock()
+_routes_mounted = False
+
+
+def _prune_expired(now):
+    """Drop expired registrations; call with _lock held."""
+    for expired in [t for t, entry in _pending.items() if entry[0] < now]:
+        del _pending[expired]
+
+
+def register_stream(chunk_factory, file_name: str, media_type: str) -> str:
+    """Register a zero-argument callable returning an iterator of bytes; returns its URL path."""
+    token = secrets.token_urlsafe(16)
+    now = time.monotonic()
+    with _lock:
+        _prune_expired(now)
+        _pending[token] = (now + DOWNLOAD_TTL_SECONDS, file_name, media_type, chunk_factory)
+    return f"/downloads/{token}"
+
+
+def stream_registered(url: str) -> bool:
+    """True while a URL returned by register_stream can still be downloaded."""
+    with _lock:
+        entry = _pending.get(url.rsplit("/", 1)[-1])
+    return entry is not None and entry[0] >= time.monotonic()
+
+
+def discard_stream(url: str) -> None:
+    """Forget a registration early, e.g. when the results it would export are replaced."""
+    with _lock:
+        _pending.pop(url.rsplit("/", 1)[-1], None)
+
+
+def streaming_available() -> bool:
+    """True when the app is served through server.py and /downloads/{token} is live."""
+    return _routes_mounted
+
+
+def _serve_download(request):
+    with _lock:
+        _prune_expired(time.monotonic())
+        entry = _pending.get(request.path_params["token"])
+    if entry is None or entry[0] < time.monotonic():
+        return PlainTextResponse("This download link has expired. Generate it again in the app.", status_code=404)
+    _, file_name, media_type, chunk_factory = entry
+    # A sync iterator is consumed in Starlette's threadpool, one chunk at a time.
+    return StreamingResponse(chunk_factory(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+
+def stream_routes() -> list:
+    """Routes to pass to st.App(routes=...); marks streaming downloads as available."""
+    global _routes_mounted
+    _routes_mounted = True
+    return [Route("/downloads/{token}", _serve_download)]
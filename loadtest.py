@@ -0,0 +1,526 @@
+# loadtest.py — local load-testing harness for the AASHTO Soil Classification Tool
+# Automation_hub Engineering Group Limited
+#
+# Streamlit runs every browser session's script in its own thread inside one
+# server process, so N simulated clients here are N threads replaying the same
+# calls the UI makes (build_sample_result, batch_row_to_result, create_pdf_report,
+# iter_batch_zip) against one in-process copy of the app. That reproduces the GIL
+# and matplotlib contention a single app instance sees.
+#
+# With --serve the harness also starts server.py (the app plus its download
+# routes) and adds server workloads, whose CPU and RSS are sampled on the server:
+#   session        websocket clients submit the single-sample form
+#   session_batch  websocket clients upload a batch CSV and classify it
+#   zip_stream     HTTP clients download the streamed per-sample ZIP
+# (--serve needs the `websockets` package.)
+#
+#   python loadtest.py --clients 8 --iterations 5
+#   python loadtest.py --clients 4 --batch-csv recorded_batch.csv --serve
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "aashto_app.py")
+SERVER_PATH = os.path.join(os.path.dirname(APP_PATH), "server.py")
+WORKLOADS = ("single", "batch", "batch_pdf", "batch_zip")
+SERVER_WORKLOADS = ("session", "session_batch", "zip_stream")
+
+# Bare-mode chatter from importing the app outside `streamlit run`; anything else still logs.
+_BARE_MODE_NOISE = ("missing ScriptRunContext", "`label` got an empty value",
+                    "Session state does not function", "Streamlit app on a browser")
+
+
+class _BareModeNoiseFilter(logging.Filter):
+    def filter(self, record):
+        return not any(noise in record.getMessage() for noise in _BARE_MODE_NOISE)
+
+
+# create_pdf_report swallows logo/chart/PDF failures and reports them through st.error.
+# The harness replaces st.error so those count as failed requests instead of vanishing.
+_st_errors = threading.local()
+
+
+def _record_st_error(body, *args, **kwargs):
+    messages = getattr(_st_errors, "messages", None)
+    if messages is not None:
+        messages.append(str(body))
+
+
+def load_app():
+    """Import the app in Streamlit bare mode to reach its pipeline functions."""
+    import streamlit
+    for name in ("streamlit", "streamlit.runtime.scriptrunner_utils.script_run_context",
+                 "streamlit.elements.lib.policies", "streamlit.runtime.state.session_state_proxy"):
+        logging.getLogger(name).addFilter(_BareModeNoiseFilter())
+    os.chdir(os.path.dirname(APP_PATH))  # branding assets and style.css are relative paths
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    import aashto_app
+    streamlit.error = _record_st_error
+    return aashto_app
+
+
+# =============================================================================
+# 1. RECORDED WORKLOADS
+# =============================================================================
+
+def synthetic_batch(n_rows, seed=0):
+    """Rows in the batch CSV template format, spread across the AASHTO groups."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(1, n_rows + 1):
+        pass_200 = rng.randint(3, 95)
+        pass_40 = rng.randint(pass_200, 100)
+        pass_10 = rng.randint(pass_40, 100)
+        ll = rng.randint(15, 70)
+        non_plastic = rng.random() < 0.15
+        rows.append({
+            "Sample_ID": f"BH-{(i - 1) // 4 + 1} @ {1.5 * ((i - 1) % 4 + 1):.1f}m",
+            "LL": ll, "PL": rng.randint(10, ll), "Non_Plastic": "Y" if non_plastic else "N",
+            "Pass_10": pass_10, "Pass_40": pass_40, "Pass_200": pass_200,
+            "Stone": rng.choice("NNNY"), "Organic_Matter": rng.choice("NNNNY"), "Mottled_Color": rng.choice("NNNY"),
+        })
+    return pd.DataFrame(rows)
+
+
+def load_batch(args):
+    if args.batch_csv:
+        return pd.read_csv(args.batch_csv)
+    return synthetic_batch(args.batch_rows, args.seed)
+
+
+def check_batch_zip(data, n_samples):
+    """Raise unless `data` is a valid per-sample ZIP with every PDF and no ERROR.txt entries."""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        bad_entry = zf.testzip()
+        if bad_entry:
+            raise RuntimeError(f"corrupt ZIP entry {bad_entry}")
+        names = zf.namelist()
+        failed = [name for name in names if name.endswith(".ERROR.txt")]
+        if failed:
+            raise RuntimeError(f"{failed[0]}: {zf.read(failed[0]).decode(errors='replace').strip()}")
+    pdfs = sum(name.endswith(".pdf") for name in names)
+    if pdfs != n_samples or not any(name.endswith(".csv") for name in names):
+        raise RuntimeError(f"ZIP has {pdfs} of {n_samples} PDFs and {len(names) - pdfs} other entries")
+
+
+def make_workloads(app, rows, args):
+    """Return {name: callable(client_id, iteration)}; each call is one timed request."""
+    pdf_samples = [app.batch_row_to_result(row) for row in rows[:args.pdf_samples]]
+    results_csv = app.batch_summary_df(pdf_samples).to_csv(index=False)
+
+    def single(client_id, iteration):
+        app.batch_row_to_result(rows[(client_id * args.iterations + iteration) % len(rows)])
+
+    def batch(client_id, iteration):
+        [app.batch_row_to_result(row) for row in rows]
+
+    def batch_pdf(client_id, iteration):
+        if app.create_pdf_report(pdf_samples, f"Load test {client_id}-{iteration}", "Load test client",
+                                 "Load test engineer") is None:
+            raise RuntimeError("create_pdf_report returned None")
+
+    def batch_zip(client_id, iteration):
+        # Streamed responses run outside a script thread, so problems land in ERROR.txt, not st.error.
+        check_batch_zip(b"".join(app.iter_batch_zip(pdf_samples, f"Load test {client_id}-{iteration}",
+                                                    "Load test client", "Load test engineer",
+                                                    results_csv=results_csv)), len(pdf_samples))
+
+    return {"single": single, "batch": batch, "batch_pdf": batch_pdf, "batch_zip": batch_zip}
+
+
+# =============================================================================
+# 2. SERVER SESSIONS (websocket and HTTP clients of server.py)
+# =============================================================================
+
+SINGLE_FORM_FIELDS = {
+    "Sample / Borehole ID": "Sample_ID", "Liquid Limit (LL)": "LL", "Plastic Limit (PL)": "PL",
+    "Check if Non-Plastic (N.P)": "Non_Plastic", "Sieve No. 10 (2.0 mm)": "Pass_10",
+    "Sieve No. 40 (0.425 mm)": "Pass_40", "Sieve No. 200 (0.075 mm)": "Pass_200",
+    "⚠️ Select any red flags identified in the soil:": None,
+}
+
+
+async def _rerun(ws, widget_states=(), timeout=120, session=None):
+    """Ask the server to run the script once; return the elements it rendered.
+    Pass a dict as `session` to receive the server's session id under "id"."""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.page_script_hash = ""
+    msg.rerun_script.widget_states.widgets.extend(widget_states)
+    await ws.send(msg.SerializeToString())
+    elements = []
+    while True:
+        forward = ForwardMsg()
+        forward.ParseFromString(await asyncio.wait_for(ws.recv(), timeout))
+        kind = forward.WhichOneof("type")
+        if kind == "new_session" and session is not None:
+            session["id"] = forward.new_session.initialize.session_id
+        elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+            elements.append(forward.delta.new_element)
+        elif kind == "script_finished":
+            if forward.script_finished != ForwardMsg.FINISHED_SUCCESSFULLY:
+                raise RuntimeError(f"script run ended with status {forward.script_finished}")
+            return elements
+
+
+def _single_form_states(elements, row, flag_columns):
+    """Widget states that fill the single-sample form from a batch row and press Classify."""
+    from streamlit.proto.NumberInput_pb2 import NumberInput
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    states, submit = [], None
+    for el in elements:
+        kind = el.WhichOneof("type")
+        widget = getattr(el, kind)
+        if kind == "button" and widget.form_id == "soil_form" and widget.is_form_submitter:
+            submit = WidgetState(id=widget.id, trigger_value=True)
+        elif kind in ("text_input", "number_input", "checkbox", "multiselect") and widget.label in SINGLE_FORM_FIELDS:
+            column = SINGLE_FORM_FIELDS[widget.label]
+            state = WidgetState(id=widget.id)
+            if kind == "text_input":
+                state.string_value = str(row.get(column, "Sample"))
+            elif kind == "checkbox":
+                state.bool_value = str(row.get(column, "N")).strip().upper().startswith("Y")
+            elif kind == "multiselect":
+                state.string_array_value.data.extend(
+                    flag for col, flag in flag_columns.items() if str(row.get(col, "N")).strip().upper().startswith("Y"))
+            elif widget.data_type == NumberInput.INT:
+                state.int_value = int(round(float(row.get(column, 0) or 0)))
+            else:
+                state.double_value = float(row.get(column, 0) or 0)
+            states.append(state)
+    if submit is None:
+        raise RuntimeError("single-sample form not found on the page")
+    return states + [submit]
+
+
+def _raise_on_errors(elements):
+    from streamlit.proto.Alert_pb2 import Alert
+
+    errors = [el.alert.body for el in elements if el.WhichOneof("type") == "alert" and el.alert.format == Alert.ERROR]
+    errors += [el.exception.message for el in elements if el.WhichOneof("type") == "exception"]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+
+
+def _connect(port):
+    import websockets
+
+    return websockets.connect(f"ws://localhost:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None)
+
+
+async def _session_visit(port, row, flag_columns):
+    async with _connect(port) as ws:
+        page = await _rerun(ws)
+        result = await _rerun(ws, _single_form_states(page, row, flag_columns))
+    _raise_on_errors(result)
+    if not any(el.WhichOneof("type") == "alert" and "AASHTO Classification" in el.alert.body for el in result):
+        raise RuntimeError("classification result was not rendered")
+
+
+def _upload_file(port, session_id, file_name, data):
+    """PUT one file the way st.file_uploader does; return its UploadedFileInfo."""
+    from streamlit.proto.Common_pb2 import UploadedFileInfo
+
+    file_id, boundary = uuid.uuid4().hex, uuid.uuid4().hex
+    upload_url = f"/_stcore/upload_file/{session_id}/{file_id}"
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{file_id}"; filename="{file_name}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n').encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(f"http://localhost:{port}{upload_url}", data=body, method="PUT",
+                                     headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    with urllib.request.urlopen(request, timeout=60):
+        pass
+    info = UploadedFileInfo(name=file_name, size=len(data), file_id=file_id)
+    info.file_urls.file_id, info.file_urls.upload_url, info.file_urls.delete_url = file_id, upload_url, upload_url
+    return info
+
+
+def _find_widget(elements, kind, label):
+    for el in elements:
+        if el.WhichOneof("type") == kind and getattr(el, kind).label == label:
+            return getattr(el, kind)
+    raise RuntimeError(f"{kind} '{label}' not found on the page")
+
+
+async def _batch_session_visit(port, batch_csv):
+    """Upload a batch CSV, press Classify All Samples; return the per-sample ZIP link it renders."""
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    session = {}
+    async with _connect(port) as ws:
+        page = await _rerun(ws, session=session)
+        uploader = _find_widget(page, "file_uploader", "Upload Batch CSV")
+        info = await asyncio.to_thread(_upload_file, port, session["id"], "batch.csv", batch_csv)
+        upload_state = WidgetState(id=uploader.id)
+        upload_state.file_uploader_state_value.uploaded_file_info.append(info)
+        page = await _rerun(ws, [upload_state])
+        _raise_on_errors(page)
+        classify = _find_widget(page, "button", "🚀 Classify All Samples")
+        result = await _rerun(ws, [upload_state, WidgetState(id=classify.id, trigger_value=True)])
+    _raise_on_errors(result)
+    links = [el.link_button.url for el in result if el.WhichOneof("type") == "link_button"]
+    if not links:
+        raise RuntimeError("batch results were not rendered (no streamed ZIP link; is server.py serving?)")
+    return links[0]
+
+
+def _download(port, url):
+    with urllib.request.urlopen(f"http://localhost:{port}{url}", timeout=600) as resp:
+        return resp.read()
+
+
+def make_server_workloads(app, rows, args):
+    batch_csv = pd.DataFrame(rows).to_csv(index=False).encode()
+    zip_url = None
+
+    def session(client_id, iteration):
+        row = rows[(client_id * args.iterations + iteration) % len(rows)]
+        asyncio.run(_session_visit(args.port, row, app.BATCH_FLAG_COLUMNS))
+
+    def session_batch(client_id, iteration):
+        asyncio.run(_batch_session_visit(args.port, batch_csv))
+
+    def zip_stream(client_id, iteration):
+        if zip_url is None:
+            raise RuntimeError("no ZIP link; the setup session failed")
+        check_batch_zip(_download(args.port, zip_url), min(args.pdf_samples, len(rows)))
+
+    def setup_zip_stream():
+        # One untimed session classifies the PDF-sized batch; every client then streams its link.
+        nonlocal zip_url
+        zip_csv = pd.DataFrame(rows[:args.pdf_samples]).to_csv(index=False).encode()
+        zip_url = asyncio.run(_batch_session_visit(args.port, zip_csv))
+
+    return {"session": session, "session_batch": session_batch, "zip_stream": zip_stream}, \
+        {"zip_stream": setup_zip_stream}
+
+
+def start_server(port, timeout=60):
+    """Start server.py headless and wait for its health endpoint. XSRF protection is
+    off so the harness can upload batch CSVs without a browser cookie."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", SERVER_PATH, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false",
+         "--server.enableXsrfProtection", "false"],
+        cwd=os.path.dirname(APP_PATH), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://localhost:{port}/_stcore/health"
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return proc, time.perf_counter() - start
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"streamlit did not become healthy on port {port} within {timeout}s")
+
+
+# =============================================================================
+# 3. MEASUREMENT
+# =============================================================================
+
+def current_rss_mb(pid="self"):
+    """Resident set size from /proc (Linux); falls back to this process's peak RSS elsewhere."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid != "self":
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def cpu_seconds(pid="self"):
+    """User + system CPU time of this process, or of another one via /proc (Linux)."""
+    if pid == "self":
+        return time.process_time()
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except OSError:
+        return float("nan")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid="self", interval=0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = current_rss_mb(pid)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb(self.pid))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def run_workload(name, fn, clients, iterations, pid="self"):
+    """Run fn from `clients` threads; CPU and RSS are measured on `pid` (the harness or the server)."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def client(client_id):
+        for iteration in range(iterations):
+            _st_errors.messages = []
+            start = time.perf_counter()
+            try:
+                fn(client_id, iteration)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                if _st_errors.messages:
+                    errors.extend(f"st.error: {m}" for m in _st_errors.messages)
+                else:
+                    latencies.append(elapsed)
+
+    rss_before = current_rss_mb(pid)
+    sampler = RssSampler(pid)
+    sampler.start()
+    cpu_start, wall_start = cpu_seconds(pid), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_seconds(pid) - cpu_start
+    peak_rss = sampler.stop()
+
+    latencies.sort()
+    requests = clients * iterations
+    return {
+        "workload": name, "measured": "harness" if pid == "self" else "server", "clients": clients,
+        "requests": requests, "ok": len(latencies), "failed": requests - len(latencies),
+        "errors": len(errors), "error_samples": sorted(set(errors))[:5],
+        "p50_ms": percentile(latencies, 50) * 1000, "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "wall_s": wall, "cpu_s": cpu, "cpu_pct": 100 * cpu / wall if wall else 0.0,
+        "rss_start_mb": rss_before, "rss_peak_mb": peak_rss,
+    }
+
+
+# =============================================================================
+# 4. CLI
+# =============================================================================
+
+def print_report(results):
+    header = f"{'workload':<13} {'measured':>8} {'clients':>7} {'ok':>5} {'fail':>5} {'p50 ms':>9} {'p95 ms':>9} " \
+             f"{'p99 ms':>9} {'req/s':>8} {'cpu %':>7} {'rss MB':>15}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['workload']:<13} {r['measured']:>8} {r['clients']:>7} {r['ok']:>5} {r['failed']:>5} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['throughput_rps']:>8.2f} "
+              f"{r['cpu_pct']:>7.0f} {r['rss_start_mb']:>7.0f}->{r['rss_peak_mb']:<7.0f}")
+    for r in results:
+        for err in r["error_samples"]:
+            print(f"  [{r['workload']}] {err}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay classification and PDF workloads from concurrent clients.")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent simulated clients (default 4)")
+    parser.add_argument("--iterations", type=int, default=2, help="requests per client per workload (default 2)")
+    parser.add_argument("--workloads",
+                        help=f"comma-separated subset of {', '.join(WORKLOADS + SERVER_WORKLOADS)} "
+                             "(default: all in-process workloads, plus the server ones with --serve)")
+    parser.add_argument("--batch-csv", help="recorded batch upload to replay (batch template columns)")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="rows in the synthetic batch (default 1000)")
+    parser.add_argument("--pdf-samples", type=int, default=20, help="samples per batch PDF / ZIP (default 20)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--serve", action="store_true",
+                        help="start server.py and drive websocket sessions and ZIP downloads against it")
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.workloads:
+        selected = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    else:
+        selected = list(WORKLOADS) + (list(SERVER_WORKLOADS) if args.serve else [])
+    unknown = set(selected) - set(WORKLOADS + SERVER_WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workload(s): {', '.join(sorted(unknown))}")
+    if set(selected) & set(SERVER_WORKLOADS) and not args.serve:
+        parser.error(f"the {', '.join(SERVER_WORKLOADS)} workloads need --serve")
+    if args.serve:
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            parser.error("--serve needs the `websockets` package (pip install websockets)")
+
+    server, report = None, {"args": vars(args), "server": None, "results": []}
+    try:
+        app = load_app()
+        rows = [row for _, row in load_batch(args).iterrows()]
+        workloads, setups = make_workloads(app, rows, args), {}
+        if args.serve:
+            server, startup = start_server(args.port)
+            server_workloads, setups = make_server_workloads(app, rows, args)
+            workloads.update(server_workloads)
+            report["server"] = {"startup_s": startup, "idle_rss_mb": current_rss_mb(server.pid)}
+            print(f"streamlit ready on :{args.port} in {startup:.1f}s, idle RSS {report['server']['idle_rss_mb']:.0f} MB")
+        for name in selected:
+            if name in setups:
+                try:
+                    setups[name]()
+                except Exception as e:
+                    print(f"{name} setup failed: {type(e).__name__}: {e}")
+            pid = server.pid if name in SERVER_WORKLOADS else "self"
+            report["results"].append(run_workload(name, workloads[name], args.clients, args.iterations, pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print_report(report["results"])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(r["failed"] for r in report["results"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
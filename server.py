@@ -0,0 +1,11 @@
+# server.py — ASGI entry point for the AASHTO Soil Classification Tool
+# Automation_hub Engineering Group Limited
+#
+# Serves aashto_app.py plus the streaming download routes from downloads.py.
+#   streamlit run server.py        (or)        uvicorn server:app --port 8501
+
+import streamlit as st
+
+from downloads import stream_routes
+
+app = st.App("aashto_app.py", routes=stream_routes())